@@ -0,0 +1,19 @@
+"""
+Compile the hot parsing modules (src/utils.py, src/scraper.py) with mypyc.
+Run with: uv run --group compile python build_mypyc.py build_ext --inplace
+
+The resulting .so files shadow the pure-Python modules; delete src/*.so and
+*__mypyc*.so to go back to pure Python.
+"""
+from mypyc.build import mypycify
+from setuptools import setup
+
+setup(
+    name="openfuel-native",
+    # Explicit layout: without it setuptools treats src/ as a src-layout root
+    # and writes the extensions to src/src/
+    package_dir={"": "."},
+    packages=[],
+    py_modules=[],
+    ext_modules=mypycify(["src/utils.py", "src/scraper.py"]),
+)
@@ -6,18 +6,31 @@ Run with: uv run python main.py
 import json
 import logging
 import sys
-from datetime import datetime, timezone, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
 from pathlib import Path
+from typing import Dict, List, Optional
+from zoneinfo import ZoneInfo
+
+import orjson
+import requests
 
 from src.scraper import (
     fetch_fuel_data,
-    parse_fuel_data,
+    parse_fuel_data_cached,
     get_scraper,
+    save_cookies,
     PETROL_URL,
     DIESEL_URL,
     ExtractionError,
-    CLOUDSCRAPER_AVAILABLE,
+    NotModified,
 )
+from src.utils import find_price_outliers
+
+IST = ZoneInfo("Asia/Kolkata")
+OUTPUT_PATH = Path("prices.json")
+# Sidecar holding ETag / Last-Modified validators per fuel type
+META_PATH = Path("prices.meta.json")
 
 
 # Configure logging
@@ -32,64 +45,159 @@ logger = logging.getLogger(__name__)
 
 def get_ist_timestamp() -> str:
     """Return the current timestamp in IST timezone (ISO 8601)."""
-    ist = timezone(timedelta(hours=5, minutes=30))
-    return datetime.now(ist).isoformat()
+    return datetime.now(IST).isoformat()
 
 
-def scrape_fuel_prices() -> dict:
+def load_json(path: Path) -> dict:
     """
-    Main function to scrape petrol and diesel prices.
+    Load a previously written JSON file, returning {} if it is missing or invalid.
 
-    Returns:
-        dict: Data structure with petrol and diesel price lists.
+    Args:
+        path: Path to the JSON file.
+    """
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def _validators_for(
+    fuel_type: str, previous: dict, validators: Optional[dict]
+) -> Optional[Dict[str, str]]:
+    """
+    Return the per-fuel validator dict to use for a conditional GET.
+
+    Validators are only sent when the previous output still holds data for
+    this fuel type, since a 304 response means reusing that data as-is.
+    """
+    if validators is None:
+        return None
+    fuel_validators = validators.setdefault(fuel_type, {})
+    if not previous.get(fuel_type):
+        fuel_validators.clear()
+    return fuel_validators
+
+
+def _reuse_previous(fuel_type: str, previous: dict) -> List[dict]:
+    """
+    Return the previous price list for a page the server reported as unchanged.
 
     Raises:
-        ExtractionError: If scraping fails critically.
+        ExtractionError: If there is no previous data to reuse, e.g. the server
+            answered 304 to a request sent without validators.
     """
-    if not CLOUDSCRAPER_AVAILABLE:
-        logger.error(
-            "cloudscraper is not installed. Install with: uv add cloudscraper"
+    data = previous.get(fuel_type)
+    if not data:
+        raise ExtractionError(
+            f"{fuel_type.capitalize()} page unchanged but no previous data to reuse"
         )
-        sys.exit(1)
+    return data
 
-    logger.info("=" * 70)
-    logger.info("Starting OpenFuel scraping pipeline")
-    logger.info("=" * 70)
 
-    # Create a single scraper instance to reuse
-    scraper = get_scraper()
+def drop_price_outliers(data: List[dict], fuel_type: str) -> List[dict]:
+    """
+    Remove entries whose price is an outlier against the rest of the batch.
 
-    # Fetch and parse petrol data
-    logger.info("Fetching petrol prices...")
-    petrol_html = fetch_fuel_data(PETROL_URL, session=scraper)
+    Each dropped entry is logged; the remaining entries keep their order.
+    """
+    outliers = set(find_price_outliers(data))
+    if not outliers:
+        return data
 
-    if petrol_html is None:
-        logger.error("Failed to fetch petrol data")
-        raise ExtractionError("Could not fetch petrol data from source")
+    for index in sorted(outliers):
+        logger.warning(
+            "Dropping outlier %s price for %s: %s",
+            fuel_type,
+            data[index]["city"],
+            data[index]["price"],
+        )
+    return [entry for index, entry in enumerate(data) if index not in outliers]
 
-    try:
-        petrol_data = parse_fuel_data(petrol_html, "petrol")
-        logger.info("Successfully extracted %d petrol prices", len(petrol_data))
-    except ExtractionError as exc:
-        logger.error("Failed to parse petrol data: %s", exc)
-        raise
 
-    # Fetch and parse diesel data
-    logger.info("Fetching diesel prices...")
-    diesel_html = fetch_fuel_data(DIESEL_URL, session=scraper)
+def scrape_fuel_prices(
+    previous: Optional[dict] = None, validators: Optional[dict] = None
+) -> dict:
+    """
+    Main function to scrape petrol and diesel prices.
 
-    if diesel_html is None:
-        logger.error("Failed to fetch diesel data")
-        raise ExtractionError("Could not fetch diesel data from source")
+    Args:
+        previous: Previously saved output (prices.json contents). Its price
+            lists are reused for any page the server reports as unchanged.
+        validators: Cache validators keyed by fuel type (prices.meta.json
+            contents). Sent as conditional GET headers and updated in place
+            with the values from fresh responses.
 
-    try:
-        diesel_data = parse_fuel_data(diesel_html, "diesel")
-        logger.info("Successfully extracted %d diesel prices", len(diesel_data))
-    except ExtractionError as exc:
-        logger.error("Failed to parse diesel data: %s", exc)
-        raise
+    Returns:
+        dict: Data structure with petrol and diesel price lists.
+
+    Raises:
+        ExtractionError: If scraping fails critically.
+    """
+    logger.info("=" * 70)
+    logger.info("Starting OpenFuel scraping pipeline")
+    logger.info("=" * 70)
+
+    previous = previous or {}
+    petrol_validators = _validators_for("petrol", previous, validators)
+    diesel_validators = _validators_for("diesel", previous, validators)
+
+    # Create a single scraper instance to reuse; closed once both fetches are done
+    with get_scraper() as scraper:
+        # Fetch both pages concurrently; the requests are network-bound and the
+        # client's connection pool is safe to share across threads (with the
+        # HTTP/2 fallback both requests are multiplexed on one connection).
+        logger.info("Fetching petrol and diesel prices...")
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            petrol_future = executor.submit(
+                fetch_fuel_data, PETROL_URL, session=scraper, validators=petrol_validators
+            )
+            diesel_future = executor.submit(
+                fetch_fuel_data, DIESEL_URL, session=scraper, validators=diesel_validators
+            )
+            petrol_html = petrol_future.result()
+            diesel_html = diesel_future.result()
+
+        if petrol_html is None:
+            logger.error("Failed to fetch petrol data")
+            raise ExtractionError("Could not fetch petrol data from source")
+
+        if diesel_html is None:
+            logger.error("Failed to fetch diesel data")
+            raise ExtractionError("Could not fetch diesel data from source")
+
+        # Both pages came through, so any Cloudflare clearance is worth keeping.
+        # Only the requests-based cloudscraper session carries one.
+        if isinstance(scraper, requests.Session):
+            save_cookies(scraper)
+
+    if isinstance(petrol_html, NotModified):
+        petrol_data = _reuse_previous("petrol", previous)
+        logger.info("Petrol page unchanged, reusing %d previous prices", len(petrol_data))
+    else:
+        try:
+            petrol_data = parse_fuel_data_cached(petrol_html, "petrol")
+            logger.info("Successfully extracted %d petrol prices", len(petrol_data))
+        except ExtractionError as exc:
+            logger.error("Failed to parse petrol data: %s", exc)
+            raise
+
+    if isinstance(diesel_html, NotModified):
+        diesel_data = _reuse_previous("diesel", previous)
+        logger.info("Diesel page unchanged, reusing %d previous prices", len(diesel_data))
+    else:
+        try:
+            diesel_data = parse_fuel_data_cached(diesel_html, "diesel")
+            logger.info("Successfully extracted %d diesel prices", len(diesel_data))
+        except ExtractionError as exc:
+            logger.error("Failed to parse diesel data: %s", exc)
+            raise
 
     # Validate we got reasonable data
+    petrol_data = drop_price_outliers(petrol_data, "petrol")
+    diesel_data = drop_price_outliers(diesel_data, "diesel")
+
     if len(petrol_data) < 20:
         logger.warning(
             "Only got %d petrol prices, expected at least 20", len(petrol_data)
@@ -118,7 +226,7 @@ def scrape_fuel_prices() -> dict:
     return output
 
 
-def save_json(data: dict, output_path: Path = Path("prices.json")) -> None:
+def save_json(data: dict, output_path: Path = OUTPUT_PATH) -> None:
     """
     Save scraped data to JSON file.
 
@@ -129,8 +237,10 @@ def save_json(data: dict, output_path: Path = Path("prices.json")) -> None:
     logger.info("Saving data to %s...", output_path)
 
     try:
-        with open(output_path, "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
+        # orjson emits UTF-8 bytes, matching json.dump(indent=2, ensure_ascii=False)
+        output_path.write_bytes(
+            orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+        )
 
         logger.info("Successfully saved to %s", output_path)
         file_size = output_path.stat().st_size
@@ -143,8 +253,13 @@ def save_json(data: dict, output_path: Path = Path("prices.json")) -> None:
 def main() -> None:
     """Main entry point."""
     try:
-        data = scrape_fuel_prices()
+        previous = load_json(OUTPUT_PATH)
+        validators = load_json(META_PATH)
+
+        data = scrape_fuel_prices(previous, validators)
         save_json(data)
+        # Only record validators once the matching prices are on disk
+        save_json(validators, META_PATH)
 
         logger.info("Sample data:")
         if data.get("petrol"):
@@ -1,10 +1,17 @@
+import hashlib
+import json
 import logging
-from typing import Dict, List, Optional, Union
+import os
+import pickle
+import time
+from pathlib import Path
+from typing import Dict, FrozenSet, List, Optional, Set, Union
 
+import httpx
 import requests
 from requests.adapters import HTTPAdapter
 from urllib3.util import Retry
-from bs4 import BeautifulSoup
+from selectolax.lexbor import LexborHTMLParser
 
 from src.utils import clean_price_string
 
@@ -25,6 +32,15 @@ USER_AGENT = (
     "Chrome/120.0.0.0 Safari/537.36"
 )
 REQUEST_TIMEOUT = 30  # Increased for Cloudflare challenges
+PARSE_CACHE_DIR = Path("cache")
+# Part of every parse cache key; bump whenever parse_fuel_data's extraction
+# logic changes so results cached by an older parser are not reused
+PARSER_VERSION = 2
+# Cloudflare clearance cookies persisted between runs so the JS challenge is
+# only solved when they have expired
+COOKIE_JAR_PATH = Path(
+    os.environ.get("OPENFUEL_COOKIE_JAR", "~/.openfuel/cookies.pkl")
+).expanduser()
 
 # CSS Selectors
 CSS_SELECTOR_BLOCK = "gd-fuel-table-block"
@@ -33,12 +49,38 @@ CSS_SELECTOR_ROW = "tr"
 CSS_SELECTOR_HEADER = "th"
 CSS_SELECTOR_CELL = "td"
 
+# Full selectors composed once from the parts above.
+# A single descendant selector visits each row once, instead of querying
+# blocks, then tables, then rows. Header rows (a direct <th> child) are
+# filtered inside the selector engine rather than probed per row.
+CSS_SELECTOR_FUEL_TABLE = f"div.{CSS_SELECTOR_BLOCK} table.{CSS_SELECTOR_TABLE}"
+CSS_SELECTOR_DATA_ROW = (
+    f"{CSS_SELECTOR_FUEL_TABLE} {CSS_SELECTOR_ROW}:not(:has(> {CSS_SELECTOR_HEADER}))"
+)
+
+# Markers of a Cloudflare challenge page, matched as the cased byte strings the
+# challenge page actually uses, so the body is never decoded or lowercased and
+# each check is a single fast substring search. "Ray ID" is tested first since
+# it is rare on real pages and short-circuits the brand check.
+CLOUDFLARE_RAY_ID = b"Ray ID"
+CLOUDFLARE_MARKERS = (b"Cloudflare", b"cloudflare", b"CloudFlare")
+
 
 class ExtractionError(Exception):
     """Raised when fuel data extraction fails (e.g., no tables found)."""
     pass
 
 
+class NotModified:
+    """Sentinel type returned by fetch_fuel_data when the server answers 304."""
+
+    def __repr__(self) -> str:
+        return "NOT_MODIFIED"
+
+
+NOT_MODIFIED = NotModified()
+
+
 def get_request_session() -> requests.Session:
     """
     Create and configure a requests.Session with retry and headers.
@@ -63,12 +105,74 @@ def get_request_session() -> requests.Session:
     return session
 
 
-def get_scraper():
+class RetryTransport(httpx.BaseTransport):
+    """
+    httpx transport that retries GET responses with a retryable status code.
+
+    Mirrors the urllib3 Retry used by get_request_session: up to `total`
+    retries on 429/500/502/503/504, sleeping backoff_factor * 2 ** (n - 1)
+    seconds before the n-th retry.
+    """
+
+    def __init__(
+        self,
+        transport: httpx.BaseTransport,
+        total: int = 3,
+        backoff_factor: float = 1,
+        status_forcelist: FrozenSet[int] = frozenset({429, 500, 502, 503, 504}),
+    ) -> None:
+        self._transport = transport
+        self._total = total
+        self._backoff_factor = backoff_factor
+        self._status_forcelist = status_forcelist
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        retries = 0
+        while True:
+            response = self._transport.handle_request(request)
+            if (
+                request.method != "GET"
+                or response.status_code not in self._status_forcelist
+                or retries >= self._total
+            ):
+                return response
+            response.close()
+            retries += 1
+            backoff = self._backoff_factor * 2 ** (retries - 1)
+            logging.warning(
+                f"Got HTTP {response.status_code} from {request.url}, "
+                f"retrying in {backoff}s ({retries}/{self._total})"
+            )
+            time.sleep(backoff)
+
+    def close(self) -> None:
+        self._transport.close()
+
+
+def get_http2_client() -> httpx.Client:
+    """
+    Create an httpx.Client that speaks HTTP/2.
+
+    Concurrent requests to the same host are multiplexed over a single
+    connection, so the petrol and diesel fetches share one TLS handshake.
+    Used where Cloudflare is not a concern. Connection failures and
+    429/5xx responses are retried 3 times with exponential backoff, like
+    get_request_session.
+    """
+    return httpx.Client(
+        headers={"User-Agent": USER_AGENT},
+        timeout=REQUEST_TIMEOUT,
+        follow_redirects=True,
+        transport=RetryTransport(httpx.HTTPTransport(http2=True, retries=3)),
+    )
+
+
+def get_scraper() -> Union[requests.Session, httpx.Client]:
     """
     Create a scraper client suitable for real scraping runs.
 
     When cloudscraper is available, use it to better handle Cloudflare.
-    Otherwise, fall back to the standard requests.Session.
+    Otherwise, fall back to an HTTP/2 httpx.Client.
     """
     if CLOUDSCRAPER_AVAILABLE:
         logging.info("Using cloudscraper to bypass Cloudflare protection")
@@ -80,53 +184,138 @@ def get_scraper():
             },
             delay=10,
         )
+        load_cookies(scraper)
         return scraper
 
     logging.warning(
-        "cloudscraper not available, using basic requests (may fail with Cloudflare)"
+        "cloudscraper not available (uv add cloudscraper), using plain HTTP/2 client "
+        "(may fail with Cloudflare)"
     )
-    return get_request_session()
+    return get_http2_client()
+
+
+def load_cookies(session: requests.Session, path: Path = COOKIE_JAR_PATH) -> bool:
+    """
+    Load a cookie jar saved by save_cookies into the given session.
+
+    The jar is ignored if it is missing or unreadable. Its age does not matter:
+    cookies past their own expiry are discarded after loading, and if the
+    remaining clearance is rejected, cloudscraper solves the challenge again
+    as usual.
+
+    Args:
+        session (requests.Session): Session/scraper to receive the cookies.
+        path (Path): Location of the pickled cookie jar.
 
+    Returns:
+        bool: True if cookies were loaded, False otherwise.
+    """
+    try:
+        with open(path, "rb") as f:
+            jar = pickle.load(f)
+        session.cookies.update(jar)
+        session.cookies.clear_expired_cookies()
+    except FileNotFoundError:
+        return False
+    except Exception as e:  # noqa: BLE001
+        logging.warning(f"Could not load cookie jar {path}: {e}")
+        return False
+
+    logging.info(f"Loaded {len(session.cookies)} cookies from {path}")
+    return True
 
-def fetch_fuel_data(url: str, session: Optional[requests.Session] = None) -> Optional[str]:
+
+def save_cookies(session: requests.Session, path: Path = COOKIE_JAR_PATH) -> None:
     """
-    Fetches the raw HTML content from the given URL using a configured scraper.
+    Persist the session's cookie jar (including Cloudflare clearance) to disk.
+
+    Args:
+        session (requests.Session): Session/scraper whose cookies are saved.
+        path (Path): Location of the pickled cookie jar.
+    """
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "wb") as f:
+            pickle.dump(session.cookies, f)
+    except (OSError, TypeError, pickle.PicklingError) as e:
+        logging.warning(f"Could not save cookie jar {path}: {e}")
+
+
+def fetch_fuel_data(
+    url: str,
+    session: Optional[Union[requests.Session, httpx.Client]] = None,
+    validators: Optional[Dict[str, str]] = None,
+) -> Optional[Union[bytes, NotModified]]:
+    """
+    Fetches the raw HTML bytes from the given URL using a configured scraper.
 
     Args:
         url (str): The URL to fetch data from.
-        session (Optional[requests.Session]): Existing session/scraper to reuse.
+        session (Optional[Union[requests.Session, httpx.Client]]): Existing
+            session/scraper/client to reuse.
             If None, a new requests.Session is created via get_request_session().
+        validators (Optional[Dict[str, str]]): Cache validators from a previous
+            fetch ("etag" / "last_modified"). When present they are sent as
+            If-None-Match / If-Modified-Since, and the dict is updated in place
+            with the values from a successful response.
 
     Returns:
-        Optional[str]: The raw HTML content as a string if successful, 
-                       or None if the request fails or times out.
+        Optional[Union[bytes, NotModified]]: The undecoded response body if
+            successful, NOT_MODIFIED if the server reports the page unchanged,
+            or None if the request fails or times out. The body is left as
+            bytes so the parser can decode it natively.
     """
     client = session or get_request_session()
 
+    headers = {}
+    if validators:
+        if validators.get("etag"):
+            headers["If-None-Match"] = validators["etag"]
+        if validators.get("last_modified"):
+            headers["If-Modified-Since"] = validators["last_modified"]
+
     try:
         logging.info(f"Fetching data from {url}")
-        response = client.get(url, timeout=REQUEST_TIMEOUT)
+        response = client.get(url, headers=headers or None, timeout=REQUEST_TIMEOUT)
+
+        if response.status_code == 304:
+            logging.info(f"{url} not modified since last fetch")
+            return NOT_MODIFIED
+
         response.raise_for_status()
         
         # Verify we didn't get a Cloudflare challenge page
-        if 'cloudflare' in response.text.lower() and 'ray id' in response.text.lower():
+        body = response.content
+        if CLOUDFLARE_RAY_ID in body and any(
+            marker in body for marker in CLOUDFLARE_MARKERS
+        ):
             logging.error("Received Cloudflare challenge page instead of actual content")
             return None
+
+        if validators is not None:
+            validators.clear()
+            if response.headers.get("ETag"):
+                validators["etag"] = response.headers["ETag"]
+            if response.headers.get("Last-Modified"):
+                validators["last_modified"] = response.headers["Last-Modified"]
             
-        logging.info(f"Successfully fetched {len(response.text)} bytes from {url}")
-        return response.text
+        logging.info(f"Successfully fetched {len(body)} bytes from {url}")
+        return body
         
-    except requests.exceptions.RequestException as e:
+    except (requests.exceptions.RequestException, httpx.HTTPError) as e:
         logging.error(f"Error fetching {url}: {e}", exc_info=True)
         return None
 
 
-def parse_fuel_data(html_content: str, fuel_type: str) -> List[Dict[str, Union[str, float]]]:
+def parse_fuel_data(
+    html_content: Union[str, bytes], fuel_type: str
+) -> List[Dict[str, Union[str, float]]]:
     """
     Parses HTML content to extract fuel prices.
 
     Args:
-        html_content (str): The raw HTML content.
+        html_content (Union[str, bytes]): The raw HTML content, either decoded
+            or as UTF-8 bytes straight from fetch_fuel_data.
         fuel_type (str): The type of fuel (e.g., 'petrol' or 'diesel').
 
     Returns:
@@ -136,49 +325,94 @@ def parse_fuel_data(html_content: str, fuel_type: str) -> List[Dict[str, Union[s
     Raises:
         ExtractionError: If no valid data tables are found in the HTML.
     """
-    soup = BeautifulSoup(html_content, "html.parser")
-    blocks = soup.find_all("div", class_=CSS_SELECTOR_BLOCK)
-    
-    unique_data: Dict[str, float] = {}
-    tables_found = False
+    tree = LexborHTMLParser(html_content)
 
-    for block in blocks:
-        table = block.find("table", class_=CSS_SELECTOR_TABLE)
-        if not table:
-            continue
-        
-        tables_found = True
-        rows = table.find_all(CSS_SELECTOR_ROW)
-        
-        for row in rows:
-            # Skip header rows
-            if row.find(CSS_SELECTOR_HEADER):
-                continue
-            
-            cols = row.find_all(CSS_SELECTOR_CELL)
-            if len(cols) >= 2:
-                # Extract city/state name (usually in the first column)
-                name_col = cols[0]
-                price_col = cols[1]
-                
-                name_text = name_col.get_text(strip=True)
-                price_text = price_col.get_text(strip=True)
+    # Deduplicate on city name while building the output list in one pass
+    seen: Set[str] = set()
+    result: List[Dict[str, Union[str, float]]] = []
+    tables_found = tree.css_matches(CSS_SELECTOR_FUEL_TABLE)
+
+    for row in tree.css(CSS_SELECTOR_DATA_ROW):
+        cols = row.css(CSS_SELECTOR_CELL)
+        if len(cols) >= 2:
+            # Extract city/state name (usually in the first column)
+            name_col = cols[0]
+            price_col = cols[1]
+
+            # One C-level text() call per cell; split/join then trims the ends
+            # and collapses inner newlines/indentation to single spaces
+            name_text = " ".join(name_col.text().split())
+            price_text = " ".join(price_col.text().split())
 
-                price_val = clean_price_string(price_text)
+            price_val = clean_price_string(price_text)
 
-                if price_val is None:
-                    logging.warning(f"Could not parse price '{price_text}' for {name_text}")
-                    continue
+            if price_val is None:
+                logging.warning(f"Could not parse price '{price_text}' for {name_text}")
+                continue
 
-                if name_text and name_text not in unique_data:
-                    unique_data[name_text] = price_val
+            if name_text and name_text not in seen:
+                seen.add(name_text)
+                result.append({"city": name_text, "price": price_val})
 
-    if not unique_data:
+    if not result:
         # If tables were found but no data extracted, or no tables found at all
         if not tables_found:
              raise ExtractionError(f"No fuel table blocks found in {fuel_type} data.")
         else:
              raise ExtractionError(f"Failed to extract any fuel data from {fuel_type} page.")
 
-    logging.info(f"Successfully extracted {len(unique_data)} {fuel_type} prices")
-    return [{"city": city, "price": price} for city, price in unique_data.items()]
+    logging.info(f"Successfully extracted {len(result)} {fuel_type} prices")
+    return result
+
+
+def parse_fuel_data_cached(
+    html_content: Union[str, bytes],
+    fuel_type: str,
+    cache_dir: Path = PARSE_CACHE_DIR,
+) -> List[Dict[str, Union[str, float]]]:
+    """
+    Parses HTML content like parse_fuel_data, memoising the result on disk.
+
+    Results are keyed by PARSER_VERSION and a BLAKE2b digest of the page, so an
+    unchanged page is served from cache/{fuel_type}-{PARSER_VERSION}-{digest}.json
+    without being parsed again.
+    Older cache entries for the same fuel type are removed when a new one is
+    written. Cache read/write problems are logged and never fail the scrape.
+
+    Args:
+        html_content (Union[str, bytes]): The raw HTML content.
+        fuel_type (str): The type of fuel (e.g., 'petrol' or 'diesel').
+        cache_dir (Path): Directory holding the cached parse results.
+
+    Returns:
+        List[Dict[str, Union[str, float]]]: Same as parse_fuel_data.
+
+    Raises:
+        ExtractionError: If no valid data tables are found in the HTML.
+    """
+    raw = html_content.encode("utf-8") if isinstance(html_content, str) else html_content
+    digest = hashlib.blake2b(raw, digest_size=16).hexdigest()
+    cache_path = cache_dir / f"{fuel_type}-{PARSER_VERSION}-{digest}.json"
+
+    try:
+        with open(cache_path, "r", encoding="utf-8") as f:
+            cached = json.load(f)
+        logging.info(f"Using cached {fuel_type} prices from {cache_path}")
+        return cached
+    except FileNotFoundError:
+        pass
+    except (OSError, ValueError) as e:
+        logging.warning(f"Ignoring unreadable parse cache {cache_path}: {e}")
+
+    data = parse_fuel_data(html_content, fuel_type)
+
+    try:
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        for stale in cache_dir.glob(f"{fuel_type}-*.json"):
+            stale.unlink()
+        with open(cache_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+    except OSError as e:
+        logging.warning(f"Could not write parse cache {cache_path}: {e}")
+
+    return data
@@ -1,5 +1,10 @@
-import re
-from typing import Optional
+from typing import Dict, List, Optional, Union
+
+import numpy as np
+
+# Robust z-score (distance from the median in MADs) above which a price is
+# treated as a scraping artifact, e.g. a shifted column
+PRICE_OUTLIER_THRESHOLD = 10.0
 
 
 def clean_price_string(price_str: str) -> Optional[float]:
@@ -12,34 +17,80 @@ def clean_price_string(price_str: str) -> Optional[float]:
     - Commas as thousands separators: "1,200.50" -> 1200.50
     - Leading/trailing whitespace is ignored
     - Returns None for invalid inputs (e.g., "", "N/A", "Free")
+
+    Digits are accumulated into an integer mantissa in a single pass, ignoring
+    every character other than ASCII digits and ".". Dividing by the decimal
+    scale at the end is correctly rounded, so results equal float() on the
+    cleaned digits (values too large for a float return None).
     """
     if price_str is None:
         return None
 
-    raw = price_str.strip()
-    if not raw:
-        return None
-
     # Normalize known mis-encoded currency prefix from the source site
-    raw = raw.replace("ƒ,1", "")
-
-    # Core regex cleaning as specified in the story
-    cleaned = re.sub(r"[^\d.]", "", raw)
-
-    # Handle multiple dots:
-    # - Accept patterns like ".96.72" that come from "Rs. 96.72" by dropping
-    #   the leading dot when the rest is a valid single-decimal number.
-    # - Reject ambiguous patterns like "1.2.3".
-    if cleaned.count(".") > 1:
-        if cleaned.startswith(".") and cleaned[1:].count(".") == 1:
-            cleaned = cleaned.lstrip(".")
-        else:
-            return None
-
-    if not cleaned:
+    raw = price_str.replace("ƒ,1", "")
+
+    mantissa = 0
+    digits = 0
+    scale = 1
+    # Dots before the first digit (e.g. the one in "Rs. 96.72"), and whether
+    # a decimal point has been seen after it
+    leading_dots = 0
+    seen_inner_dot = False
+
+    for c in raw:
+        if "0" <= c <= "9":
+            mantissa = mantissa * 10 + (ord(c) - 48)
+            digits += 1
+            if seen_inner_dot:
+                scale *= 10
+        elif c == ".":
+            if not digits:
+                leading_dots += 1
+            elif seen_inner_dot:
+                # Ambiguous patterns like "1.2.3"
+                return None
+            else:
+                seen_inner_dot = True
+
+    if not digits:
         return None
 
+    # A lone leading dot is the decimal point (".5"); when another dot
+    # follows the digits, the leading one(s) are currency noise and dropped.
+    if not seen_inner_dot and leading_dots == 1:
+        scale = 10 ** digits
+
     try:
-        return float(cleaned)
-    except ValueError:
+        return mantissa / scale
+    except OverflowError:
         return None
+
+
+def find_price_outliers(
+    entries: List[Dict[str, Union[str, float]]],
+    threshold: float = PRICE_OUTLIER_THRESHOLD,
+) -> List[int]:
+    """
+    Return the indices of entries whose price is far from the batch median.
+
+    Prices are compared in one vectorised pass using the median absolute
+    deviation (MAD), which a handful of bad values cannot skew the way they
+    would a mean/stddev z-score. An entry is flagged when
+    |price - median| / MAD > threshold.
+
+    Returns [] when there are too few entries to judge (< 3) or when MAD is 0
+    (most prices identical), since no meaningful scale exists.
+    """
+    if len(entries) < 3:
+        return []
+
+    prices = np.fromiter(
+        (entry["price"] for entry in entries), dtype=np.float32, count=len(entries)
+    )
+    median = np.median(prices)
+    deviations = np.abs(prices - median)
+    mad = np.median(deviations)
+    if mad == 0:
+        return []
+
+    return np.flatnonzero(deviations / mad > threshold).tolist()
@@ -0,0 +1,168 @@
+import json
+
+import httpx
+import pytest
+
+import main
+from main import ExtractionError, scrape_fuel_prices
+from src.scraper import NOT_MODIFIED, PETROL_URL
+
+PAGE = b"""
+<div class="gd-fuel-table-block">
+    <table class="gd-fuel-table-list">
+        <tr><th>City</th><th>Price</th></tr>
+        <tr><td>New Delhi</td><td>&#8377;94.77</td></tr>
+        <tr><td>Mumbai</td><td>&#8377;103.44</td></tr>
+    </table>
+</div>
+"""
+
+PREVIOUS = {
+    "last_updated_ist": "2024-01-01T06:00:00+05:30",
+    "petrol": [{"city": "New Delhi", "price": 94.77}],
+    "diesel": [{"city": "New Delhi", "price": 87.62}],
+}
+
+OLD_VALIDATORS = {
+    "petrol": {"etag": '"petrol-v1"'},
+    "diesel": {"etag": '"diesel-v1"'},
+}
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """Run the pipeline in a temp dir so prices.json, its meta and the parse cache stay isolated."""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(main, "get_scraper", lambda: httpx.Client())
+    return tmp_path
+
+
+def write_json(path, data):
+    path.write_text(json.dumps(data), encoding="utf-8")
+
+
+def read_json(path):
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def run_main():
+    with pytest.raises(SystemExit) as exc_info:
+        main.main()
+    return exc_info.value.code
+
+
+def test_main_reuses_previous_data_on_not_modified(workdir, monkeypatch):
+    """
+    Test that a 304 for both pages reuses the previous prices and sends the
+    stored validators.
+    """
+    write_json(workdir / "prices.json", PREVIOUS)
+    write_json(workdir / "prices.meta.json", OLD_VALIDATORS)
+    sent = []
+
+    def fake_fetch(url, session=None, validators=None):
+        sent.append(dict(validators))
+        return NOT_MODIFIED
+
+    monkeypatch.setattr(main, "fetch_fuel_data", fake_fetch)
+
+    assert run_main() == 0
+    output = read_json(workdir / "prices.json")
+    assert output["petrol"] == PREVIOUS["petrol"]
+    assert output["diesel"] == PREVIOUS["diesel"]
+    assert output["last_updated_ist"] != PREVIOUS["last_updated_ist"]
+    assert sorted(v["etag"] for v in sent) == ['"diesel-v1"', '"petrol-v1"']
+    assert read_json(workdir / "prices.meta.json") == OLD_VALIDATORS
+
+
+def test_main_clears_validators_without_previous_data(workdir, monkeypatch):
+    """
+    Test that stored validators are not sent when prices.json is missing, and
+    that the fresh validators are saved alongside the new prices.
+    """
+    write_json(workdir / "prices.meta.json", OLD_VALIDATORS)
+    sent = []
+
+    def fake_fetch(url, session=None, validators=None):
+        sent.append(dict(validators))
+        validators["etag"] = '"fresh"'
+        return PAGE
+
+    monkeypatch.setattr(main, "fetch_fuel_data", fake_fetch)
+
+    assert run_main() == 0
+    assert sent == [{}, {}]
+    output = read_json(workdir / "prices.json")
+    assert [entry["city"] for entry in output["petrol"]] == ["New Delhi", "Mumbai"]
+    assert read_json(workdir / "prices.meta.json") == {
+        "petrol": {"etag": '"fresh"'},
+        "diesel": {"etag": '"fresh"'},
+    }
+
+
+def test_main_keeps_meta_when_scrape_fails(workdir, monkeypatch):
+    """
+    Test that validators updated by a successful fetch are not written when
+    the other fetch fails, so they never describe prices that were not saved.
+    """
+    write_json(workdir / "prices.json", PREVIOUS)
+    write_json(workdir / "prices.meta.json", OLD_VALIDATORS)
+
+    def fake_fetch(url, session=None, validators=None):
+        if url == PETROL_URL:
+            validators["etag"] = '"petrol-v2"'
+            return PAGE
+        return None
+
+    monkeypatch.setattr(main, "fetch_fuel_data", fake_fetch)
+
+    assert run_main() == 1
+    assert read_json(workdir / "prices.json") == PREVIOUS
+    assert read_json(workdir / "prices.meta.json") == OLD_VALIDATORS
+
+
+def test_scrape_fuel_prices_not_modified_without_previous_data(workdir, monkeypatch):
+    """
+    Test that a 304 with no previous prices to reuse raises ExtractionError.
+    """
+    monkeypatch.setattr(main, "fetch_fuel_data", lambda url, session=None, validators=None: NOT_MODIFIED)
+
+    with pytest.raises(ExtractionError, match="Petrol page unchanged"):
+        scrape_fuel_prices({}, {})
+
+
+def test_drop_price_outliers_keeps_order_and_logs(caplog):
+    """
+    Test that outlier prices are dropped with a warning each, and that the
+    remaining entries keep their original order.
+    """
+    data = [
+        {"city": "New Delhi", "price": 94.77},
+        {"city": "Goa", "price": 9.68},
+        {"city": "Mumbai", "price": 103.44},
+        {"city": "Chennai", "price": 100.76},
+        {"city": "Kolkata", "price": 1050.0},
+        {"city": "Bengaluru", "price": 102.86},
+    ]
+
+    with caplog.at_level("WARNING", logger="main"):
+        result = main.drop_price_outliers(data, "petrol")
+
+    assert result == [data[0], data[2], data[3], data[5]]
+    assert [record.getMessage() for record in caplog.records] == [
+        "Dropping outlier petrol price for Goa: 9.68",
+        "Dropping outlier petrol price for Kolkata: 1050.0",
+    ]
+
+
+def test_drop_price_outliers_returns_input_without_outliers():
+    """
+    Test that a batch without outliers is returned unchanged.
+    """
+    data = [
+        {"city": "New Delhi", "price": 94.77},
+        {"city": "Mumbai", "price": 103.44},
+        {"city": "Chennai", "price": 100.76},
+    ]
+
+    assert main.drop_price_outliers(data, "petrol") is data
@@ -1,9 +1,15 @@
+import hashlib
+import json
+import os
+import time
+
+import httpx
 import pytest
 import requests
 import requests_mock
 from requests.adapters import HTTPAdapter
 from urllib3.util import Retry
-from src.scraper import get_request_session, fetch_fuel_data, parse_fuel_data, ExtractionError, USER_AGENT, REQUEST_TIMEOUT
+from src.scraper import get_request_session, fetch_fuel_data, parse_fuel_data, ExtractionError, USER_AGENT, REQUEST_TIMEOUT, NOT_MODIFIED, parse_fuel_data_cached, load_cookies, save_cookies, get_http2_client, get_scraper, PARSER_VERSION, RetryTransport
 
 @pytest.fixture
 def MOCK_HTML_COMPLETE():
@@ -90,7 +96,7 @@ def test_get_request_session_configuration():
 
 def test_fetch_fuel_data_success():
     """
-    Test AC 4: fetch_fuel_data returns raw HTML content on success (HTTP 200).
+    Test AC 4: fetch_fuel_data returns raw HTML bytes on success (HTTP 200).
     """
     test_url = "https://www.goodreturns.in/petrol-price.html"
     mock_html = "<html><body>Price Data</body></html>"
@@ -98,7 +104,7 @@ def test_fetch_fuel_data_success():
     with requests_mock.Mocker() as m:
         m.get(test_url, text=mock_html, status_code=200)
         result = fetch_fuel_data(test_url)
-        assert result == mock_html
+        assert result == mock_html.encode("utf-8")
 
 def test_fetch_fuel_data_timeout():
     """
@@ -141,7 +147,141 @@ def test_fetch_fuel_data_uses_provided_session():
         m.get(test_url, text=mock_html, status_code=200, request_headers={'Custom-Header': 'TestValue'})
         
         result = fetch_fuel_data(test_url, session=session)
-        assert result == mock_html
+        assert result == mock_html.encode("utf-8")
+
+def test_fetch_fuel_data_records_validators():
+    """
+    Test that fetch_fuel_data stores ETag/Last-Modified from a 200 response.
+    """
+    test_url = "https://www.goodreturns.in/petrol-price.html"
+    validators = {}
+
+    with requests_mock.Mocker() as m:
+        m.get(
+            test_url,
+            text="<html>Data</html>",
+            status_code=200,
+            headers={"ETag": '"abc123"', "Last-Modified": "Wed, 14 Oct 2026 00:30:00 GMT"},
+        )
+        fetch_fuel_data(test_url, validators=validators)
+
+    assert validators == {
+        "etag": '"abc123"',
+        "last_modified": "Wed, 14 Oct 2026 00:30:00 GMT",
+    }
+
+def test_fetch_fuel_data_not_modified():
+    """
+    Test that stored validators are sent as conditional headers and a 304
+    response yields the NOT_MODIFIED sentinel.
+    """
+    test_url = "https://www.goodreturns.in/diesel-price.html"
+    validators = {"etag": '"abc123"', "last_modified": "Wed, 14 Oct 2026 00:30:00 GMT"}
+
+    with requests_mock.Mocker() as m:
+        m.get(
+            test_url,
+            status_code=304,
+            request_headers={
+                "If-None-Match": '"abc123"',
+                "If-Modified-Since": "Wed, 14 Oct 2026 00:30:00 GMT",
+            },
+        )
+        result = fetch_fuel_data(test_url, validators=validators)
+
+    assert result is NOT_MODIFIED
+    assert validators["etag"] == '"abc123"'
+
+def test_fetch_fuel_data_cloudflare_challenge():
+    """
+    Test that a Cloudflare challenge page is rejected regardless of case.
+    """
+    test_url = "https://www.goodreturns.in/petrol-price.html"
+    challenge_html = "<html><title>Just a moment...</title><p>CloudFlare Ray ID: 8a1b2c</p></html>"
+
+    with requests_mock.Mocker() as m:
+        m.get(test_url, text=challenge_html, status_code=200)
+        result = fetch_fuel_data(test_url)
+        assert result is None
+
+def test_get_http2_client_configuration():
+    """
+    Test that get_http2_client returns an httpx.Client with the scraper User-Agent.
+    """
+    with get_http2_client() as client:
+        assert isinstance(client, httpx.Client)
+        assert client.headers["User-Agent"] == USER_AGENT
+        assert client.timeout.read == REQUEST_TIMEOUT
+
+def test_retry_transport_retries_status_with_backoff(monkeypatch):
+    """
+    Test that RetryTransport retries 429/5xx responses with exponential backoff
+    and gives up after 3 retries.
+    """
+    statuses = iter([503, 429, 200])
+    sleeps = []
+    monkeypatch.setattr("time.sleep", sleeps.append)
+
+    def handler(request):
+        return httpx.Response(next(statuses), content=b"Price Data")
+
+    transport = RetryTransport(httpx.MockTransport(handler))
+    with httpx.Client(transport=transport) as client:
+        assert client.get("https://www.goodreturns.in/petrol-price.html").status_code == 200
+    assert sleeps == [1, 2]
+
+    calls = []
+
+    def always_502(request):
+        calls.append(request)
+        return httpx.Response(502)
+
+    sleeps.clear()
+    transport = RetryTransport(httpx.MockTransport(always_502))
+    with httpx.Client(transport=transport) as client:
+        assert client.get("https://www.goodreturns.in/petrol-price.html").status_code == 502
+    assert len(calls) == 4
+    assert sleeps == [1, 2, 4]
+
+def test_get_scraper_falls_back_to_http2_client(monkeypatch):
+    """
+    Test that get_scraper returns the HTTP/2 httpx client when cloudscraper is missing.
+    """
+    monkeypatch.setattr("src.scraper.CLOUDSCRAPER_AVAILABLE", False)
+
+    with get_scraper() as client:
+        assert isinstance(client, httpx.Client)
+
+def test_fetch_fuel_data_with_httpx_client():
+    """
+    Test that fetch_fuel_data works with an httpx.Client and returns None on
+    httpx transport errors.
+    """
+    ok_url = "https://www.goodreturns.in/petrol-price.html"
+    down_url = "https://www.goodreturns.in/diesel-price.html"
+
+    def handler(request):
+        if str(request.url) == down_url:
+            raise httpx.ConnectError("connection refused", request=request)
+        return httpx.Response(200, text="<html>Data</html>", headers={"ETag": '"h2"'})
+
+    validators = {}
+    with httpx.Client(transport=httpx.MockTransport(handler)) as client:
+        assert fetch_fuel_data(ok_url, session=client, validators=validators) == b"<html>Data</html>"
+        assert fetch_fuel_data(down_url, session=client) is None
+
+    assert validators == {"etag": '"h2"'}
+
+def test_fetch_fuel_data_allows_cloudflare_cdn_reference():
+    """
+    Test that a normal page merely referencing Cloudflare (e.g. a CDN script) is accepted.
+    """
+    test_url = "https://www.goodreturns.in/petrol-price.html"
+    page = '<html><script src="https://cdnjs.cloudflare.com/x.js"></script>Price Data</html>'
+
+    with requests_mock.Mocker() as m:
+        m.get(test_url, text=page, status_code=200)
+        assert fetch_fuel_data(test_url) == page.encode("utf-8")
 
 def test_parse_fuel_data_complete(MOCK_HTML_COMPLETE):
     """
@@ -169,10 +309,151 @@ def test_parse_fuel_data_complete(MOCK_HTML_COMPLETE):
     assert 'price' in result[0]
     assert isinstance(result[0]['price'], float)
 
+def test_parse_fuel_data_accepts_bytes(MOCK_HTML_COMPLETE):
+    """
+    Test parse_fuel_data decodes UTF-8 bytes as returned by fetch_fuel_data.
+    """
+    result = parse_fuel_data(MOCK_HTML_COMPLETE.encode("utf-8"), "petrol")
+
+    assert result == parse_fuel_data(MOCK_HTML_COMPLETE, "petrol")
+
+def test_parse_fuel_data_multiline_cell():
+    """
+    Test that whitespace inside a multi-line cell collapses to single spaces.
+    """
+    html = """
+    <div class="gd-fuel-table-block">
+        <table class="gd-fuel-table-list">
+            <tr><th>City</th><th>Price</th></tr>
+            <tr>
+                <td>
+                    <a>Port</a>
+                    <a>Blair</a>
+                </td>
+                <td>
+                    ₹82.46
+                </td>
+            </tr>
+        </table>
+    </div>
+    """
+    assert parse_fuel_data(html, "petrol") == [{"city": "Port Blair", "price": 82.46}]
+
 def test_parse_fuel_data_no_table(MOCK_HTML_NO_TABLE):
     """
     Test parse_fuel_data raises ExtractionError when no tables are found.
     AC 8
     """
     with pytest.raises(ExtractionError):
-        parse_fuel_data(MOCK_HTML_NO_TABLE, "petrol")
\ No newline at end of file
+        parse_fuel_data(MOCK_HTML_NO_TABLE, "petrol")
+
+
+def test_parse_fuel_data_empty_html():
+    """
+    Test parse_fuel_data raises ExtractionError for an empty document.
+    """
+    with pytest.raises(ExtractionError):
+        parse_fuel_data("", "diesel")
+
+
+def test_parse_fuel_data_header_only_table():
+    """
+    Test parse_fuel_data raises ExtractionError when a table exists but has no data rows.
+    """
+    html = """
+    <div class="gd-fuel-table-block">
+        <table class="gd-fuel-table-list">
+            <tr><th>City</th><th>Price</th></tr>
+        </table>
+    </div>
+    """
+    with pytest.raises(ExtractionError, match="Failed to extract"):
+        parse_fuel_data(html, "petrol")
+
+
+def test_parse_fuel_data_cached_reuses_result(MOCK_HTML_COMPLETE, tmp_path):
+    """
+    Test that parse_fuel_data_cached stores the parsed result keyed by content
+    hash and serves the same page from cache without parsing it again.
+    """
+    html = MOCK_HTML_COMPLETE.encode("utf-8")
+    parse_fuel_data_cached(html, "petrol", cache_dir=tmp_path)
+
+    entries = list(tmp_path.glob("petrol-*.json"))
+    assert len(entries) == 1
+
+    # A cache hit returns whatever is on disk, so a marker entry proves the page was not re-parsed.
+    marker = [{"city": "Cached", "price": 1.23}]
+    entries[0].write_text(json.dumps(marker), encoding="utf-8")
+    assert parse_fuel_data_cached(html, "petrol", cache_dir=tmp_path) == marker
+
+def test_parse_fuel_data_cached_replaces_stale_entry(MOCK_HTML_COMPLETE, tmp_path):
+    """
+    Test that a changed page replaces the previous cache entry for that fuel type.
+    """
+    parse_fuel_data_cached(MOCK_HTML_COMPLETE, "petrol", cache_dir=tmp_path)
+    changed = MOCK_HTML_COMPLETE.replace("₹98.15", "₹99.00")
+    result = parse_fuel_data_cached(changed, "petrol", cache_dir=tmp_path)
+
+    assert {item["city"]: item["price"] for item in result}["Punjab"] == 99.00
+    assert len(list(tmp_path.glob("petrol-*.json"))) == 1
+
+
+def test_parse_fuel_data_cached_keyed_by_parser_version(MOCK_HTML_COMPLETE, tmp_path):
+    """
+    Test that an entry written by an older PARSER_VERSION is neither returned
+    nor kept for an unchanged page.
+    """
+    html = MOCK_HTML_COMPLETE.encode("utf-8")
+    digest = hashlib.blake2b(html, digest_size=16).hexdigest()
+    stale = tmp_path / f"petrol-{PARSER_VERSION - 1}-{digest}.json"
+    stale.write_text(json.dumps([{"city": "Stale", "price": 1.23}]), encoding="utf-8")
+
+    result = parse_fuel_data_cached(html, "petrol", cache_dir=tmp_path)
+
+    assert result == parse_fuel_data(html, "petrol")
+    assert not stale.exists()
+    assert [p.name for p in tmp_path.glob("petrol-*.json")] == [f"petrol-{PARSER_VERSION}-{digest}.json"]
+
+
+def test_cookie_jar_round_trip(tmp_path):
+    """
+    Test that cookies saved with save_cookies are restored by load_cookies.
+    """
+    jar_path = tmp_path / "cookies.pkl"
+    session = requests.Session()
+    session.cookies.set("cf_clearance", "token", domain=".goodreturns.in")
+    save_cookies(session, path=jar_path)
+
+    restored = requests.Session()
+    assert load_cookies(restored, path=jar_path) is True
+    assert restored.cookies.get("cf_clearance", domain=".goodreturns.in") == "token"
+
+def test_load_cookies_accepts_day_old_jar(tmp_path):
+    """
+    Test that a jar saved by the previous daily run (~24h old) is loaded, and
+    that only cookies past their own expiry are discarded.
+    """
+    jar_path = tmp_path / "cookies.pkl"
+    now = time.time()
+    session = requests.Session()
+    session.cookies.set(
+        "cf_clearance", "token", domain=".goodreturns.in", expires=int(now + 3600)
+    )
+    session.cookies.set(
+        "__cf_bm", "old", domain=".goodreturns.in", expires=int(now - 3600)
+    )
+    save_cookies(session, path=jar_path)
+    day_ago = now - 24 * 60 * 60 - 60
+    os.utime(jar_path, (day_ago, day_ago))
+
+    restored = requests.Session()
+    assert load_cookies(restored, path=jar_path) is True
+    assert restored.cookies.get("cf_clearance", domain=".goodreturns.in") == "token"
+    assert restored.cookies.get("__cf_bm", domain=".goodreturns.in") is None
+
+def test_load_cookies_missing_jar(tmp_path):
+    """
+    Test that load_cookies reports False when no jar has been saved yet.
+    """
+    assert load_cookies(requests.Session(), path=tmp_path / "missing.pkl") is False
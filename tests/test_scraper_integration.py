@@ -33,7 +33,7 @@ class TestScraperIntegration:
         
         assert html_content is not None, "Failed to fetch petrol data"
         assert len(html_content) > 0, "Petrol HTML content is empty"
-        assert "petrol" in html_content.lower(), "HTML doesn't contain 'petrol'"
+        assert b"petrol" in html_content.lower(), "HTML doesn't contain 'petrol'"
     
     def test_fetch_diesel_data(self):
         """Test fetching diesel data from the real website."""
@@ -42,7 +42,7 @@ class TestScraperIntegration:
         
         assert html_content is not None, "Failed to fetch diesel data"
         assert len(html_content) > 0, "Diesel HTML content is empty"
-        assert "diesel" in html_content.lower(), "HTML doesn't contain 'diesel'"
+        assert b"diesel" in html_content.lower(), "HTML doesn't contain 'diesel'"
     
     def test_parse_petrol_prices(self):
         """Test parsing petrol prices from real data."""
@@ -1,6 +1,6 @@
 import pytest
 
-from src.utils import clean_price_string
+from src.utils import clean_price_string, find_price_outliers
 
 
 @pytest.mark.parametrize(
@@ -11,6 +11,9 @@ from src.utils import clean_price_string
         ("Rs. 96.72", 96.72),                     # Text currency prefix
         ("1,200.50", 1200.50),                    # Comma as thousands separator
         ("  96.72  ", 96.72),                     # Surrounding whitespace
+        ("₹94.77", 94.77),                        # Rupee sign
+        ("Rs.1,200.50", 1200.50),                 # Currency dot directly before digits
+        (".5", 0.5),                              # Lone leading dot is the decimal point
     ],
 )
 def test_clean_price_string_valid_inputs(raw, expected):
@@ -25,8 +28,32 @@ def test_clean_price_string_valid_inputs(raw, expected):
         "   ",
         "N/A",
         "Free",
+        "1.2.3",
     ],
 )
 def test_clean_price_string_invalid_inputs(raw):
     assert clean_price_string(raw) is None
 
+
+def test_find_price_outliers_flags_shifted_values():
+    entries = [
+        {"city": "New Delhi", "price": 94.77},
+        {"city": "Mumbai", "price": 103.50},
+        {"city": "Chennai", "price": 100.80},
+        {"city": "Kolkata", "price": 105.01},
+        {"city": "Punjab", "price": 98.15},
+        {"city": "Shifted", "price": 2.0},
+    ]
+    assert find_price_outliers(entries) == [5]
+
+
+@pytest.mark.parametrize(
+    "prices",
+    [
+        [94.77, 9.0],                             # Too few entries to judge
+        [100.0, 100.0, 100.0, 100.0, 1.0],        # MAD of zero
+    ],
+)
+def test_find_price_outliers_skips_degenerate_batches(prices):
+    entries = [{"city": f"City{i}", "price": p} for i, p in enumerate(prices)]
+    assert find_price_outliers(entries) == []